@@ -1,14 +1,45 @@
 """Converts 5emm JSON statblock to javalent Fantasy Statblock"""
 
-import json
+import re
+import sys
 from argparse import ArgumentParser
-from collections import Counter
+from functools import lru_cache
 from math import floor
 from pathlib import Path
 
 import yaml
 from num2words import num2words
 
+try:
+    # The libyaml emitter is much faster than the pure-Python one
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+
+try:
+    # orjson parses large statblocks considerably faster than stdlib json
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+try:
+    # JIT-compile the numeric helpers when Numba is installed; this only pays
+    # off when converting many statblocks in one interpreter session
+    from numba import njit
+except ImportError:
+
+    def njit(**_kwargs):
+        """No-op stand-in for numba.njit when Numba is not installed."""
+
+        def decorator(func):
+            return func
+
+        return decorator
+
+# Attack/target counts are small and highly repetitive, so cache the spelled-out
+# words instead of re-running num2words for every attack.
+_num2words = lru_cache(maxsize=128)(num2words)
+
 
 ABILITIES = {
     "STR": "strength",
@@ -19,17 +50,43 @@ ABILITIES = {
     "CHA": "charisma",
 }
 
+_MELEE_DISTANCES = frozenset({"BOTH", "MELEE"})
+_RANGED_DISTANCES = frozenset({"BOTH", "RANGED"})
 
+
+# Per-ability description tokens, precomputed so `build_substitutions` does no
+# string formatting for them.
+_ABILITY_TOKENS = tuple(
+    (ability, f"{{DC:{ability}}}", f"{{A:{ability}}}") for ability in ABILITIES
+)
+
+
+# All tokens `process_description` knows how to replace; compiled once so the
+# hot path is a single scan with a dict lookup per match.
+_DESC_TOKEN_RE = re.compile(
+    r"\{DC:(?:STR|DEX|CON|INT|WIS|CHA)\}"
+    r"|\{A:(?:STR|DEX|CON|INT|WIS|CHA)\}"
+    r"|\{monster\.name\}"
+    r"|\{NAME\}"
+    r"|\{monster\.proficiency\}"
+    r"|\{monster\.AC\}"
+    r"|\{monster\.hp\}"
+)
+
+
+@njit(cache=True)
 def calc_modifier(score: int) -> int:
     """Converts an ability score to a modifier."""
     return (score - 10) // 2
 
 
+@njit(cache=True)
 def dice_avg(dice_type: int) -> float:
     """Returns the average roll of a dice type."""
     return (dice_type + 1) / 2
 
 
+@njit(cache=True)
 def calc_dice(count: int, dice_type: int) -> int:
     """Returns the floored average of {count}d{dice_type}."""
     return floor(count * dice_avg(dice_type))
@@ -49,33 +106,45 @@ def process_multiattack(json_stats: dict) -> str:
     # Adapted from `processMultiattackTokens` in the 5emm code
     # https://github.com/ebshimizu/5e-monster-maker/blob/892cc096e5dc5b927afa7c337de87f74325a320d/src/components/rendering/useProcessTokens.ts#L342
 
+    if not json_stats["multiattacks"]:
+        return ""
+
+    # Look up the index directly; skipping the get_action frame matters in
+    # this loop
+    if (action_index := json_stats.get("_action_index")) is None:
+        action_index = json_stats["_action_index"] = build_action_index(json_stats)
+
     rendered_ma = []
 
     for ma in json_stats["multiattacks"]:
-        # Map attacks
-        collated_attacks = Counter(ma["attacks"])
+        # Map attacks; a plain dict-get loop beats Counter for these tiny lists
+        collated_attacks: dict[str, int] = {}
+        for id_ in ma["attacks"]:
+            collated_attacks[id_] = collated_attacks.get(id_, 0) + 1
 
         # Render attacks
         attacks = []
         items = collated_attacks.items()
         for index, (id_, count) in enumerate(items):
-            name = get_action(id_, json_stats)["name"]
+            name = action_index[id_]["name"]
             text = ""
             if index == len(items) - 1 and len(items) > 1:
                 text += "and "
-            text += f"{num2words(count)} {name} attack"
+            text += f"{_num2words(count)} {name} attack"
             if count > 1:
                 text += "s"
             attacks.append(text)
 
         # Map actions
-        collated_actions = Counter(ma["actions"])
+        collated_actions: dict[str, int] = {}
+        for id_ in ma["actions"]:
+            collated_actions[id_] = collated_actions.get(id_, 0) + 1
 
         # Render actions
         actions = []
         for id_, count in collated_actions.items():
-            name = get_action(id_, json_stats)["name"]
-            attacks.append(f"{num2words(count)} {name}")
+            name = action_index[id_]["name"]
+            attacks.append(f"{_num2words(count)} {name}")
 
         # The full string
         if actions:
@@ -94,104 +163,120 @@ def process_multiattack(json_stats: dict) -> str:
     return multiattack_all
 
 
+def build_action_index(json_stats: dict) -> dict[str, dict]:
+    """Builds a map from ID to attack or action for O(1) lookups."""
+    index = {attack["id"]: attack for attack in json_stats["attacks"]}
+    index.update({action["id"]: action for action in json_stats["actions"]})
+    return index
+
+
 def get_action(id_: str, json_stats: dict) -> dict:
     """Get the attack or action with the given ID."""
-    for attack in json_stats["attacks"]:
-        if attack["id"] == id_:
-            return attack
-    for action in json_stats["actions"]:
-        if action["id"] == id_:
-            return action
-    raise ValueError(f"Attack with ID {id_} not found")
+    if (index := json_stats.get("_action_index")) is None:
+        index = json_stats["_action_index"] = build_action_index(json_stats)
+    try:
+        return index[id_]
+    except KeyError:
+        raise ValueError(f"Attack with ID {id_} not found") from None
 
 
-def process_attacks(json_stats: dict) -> list[dict[str, str]]:
+def process_attacks(json_stats: dict, subs: dict[str, str]) -> list[dict[str, str]]:
     """Generates the list of attacks"""
     attacks = []
     for attack in json_stats["attacks"]:
-        attack_str = ""
+        attack_parts = []
         distance = attack["distance"]
         if distance == "BOTH":
             distance = "Melee or Ranged"
-        attack_str += f"{distance} {attack['kind']} Attack: ".title()
+        attack_parts.append(f"{distance} {attack['kind']} Attack: ".title())
 
         modifier = attack["modifier"]
         if modifier["override"]:
             modifier = modifier["overrideValue"]
         else:
             modifier = calc_modifier(json_stats["stats"][modifier["stat"]])
-        attack_str += f"{modifier:+} to hit, "
+        attack_parts.append(f"{modifier:+} to hit, ")
 
         reach = ""
         range_ = ""
-        if attack["distance"] in {"BOTH", "MELEE"}:
-            reach = f"reach {attack['range']['reach']} ft."
-        if attack["distance"] in {"BOTH", "RANGED"}:
-            range_ = f"range {attack['range']['standard']/attack['range']['long']} ft."
-        attack_str += " or ".join(filter(None, [reach, range_])) + ", "
+        attack_range = attack["range"]
+        if attack["distance"] in _MELEE_DISTANCES:
+            reach = f"reach {attack_range['reach']} ft."
+        if attack["distance"] in _RANGED_DISTANCES:
+            range_ = f"range {attack_range['standard']}/{attack_range['long']} ft."
+        attack_parts.append(" or ".join(filter(None, [reach, range_])) + ", ")
 
         targets = attack["targets"]
-        attack_str += f"{num2words(targets)} target{'s' if targets > 1 else ''}. "
+        attack_parts.append(
+            f"{_num2words(targets)} target{'s' if targets > 1 else ''}. "
+        )
 
-        description = "Hit: "
+        desc_parts = ["".join(attack_parts), "Hit: "]
         modifier = attack["damage"]["modifier"]
         if modifier["override"]:
             modifier = modifier["overrideValue"]
         else:
             modifier = calc_modifier(json_stats["stats"][modifier["stat"]])
-        description += damage_str(
-            attack["damage"]["count"],
-            attack["damage"]["dice"],
-            modifier,
-            attack["damage"]["type"],
+        desc_parts.append(
+            damage_str(
+                attack["damage"]["count"],
+                attack["damage"]["dice"],
+                modifier,
+                attack["damage"]["type"],
+            )
         )
 
         alternate_damage = attack["alternateDamage"]
         if alternate_damage["active"]:
-            description += ", or "
+            desc_parts.append(", or ")
             modifier = alternate_damage["modifier"]
             if modifier["override"]:
                 modifier = modifier["overrideValue"]
             else:
                 modifier = calc_modifier(json_stats["stats"][modifier["stat"]])
-            description += damage_str(
-                alternate_damage["count"],
-                alternate_damage["dice"],
-                modifier,
-                attack["damage"]["type"],
+            desc_parts.append(
+                damage_str(
+                    alternate_damage["count"],
+                    alternate_damage["dice"],
+                    modifier,
+                    attack["damage"]["type"],
+                )
             )
-            description += f" {alternate_damage['condition']}"
+            desc_parts.append(f" {alternate_damage['condition']}")
 
         additional_damages = attack["additionalDamage"]
         if additional_damages:
-            description += " plus "
+            desc_parts.append(" plus ")
             for i, damage in enumerate(additional_damages, start=1):
-                description += damage_str(
-                    damage["count"],
-                    damage["dice"],
-                    0,
-                    damage["type"],
+                desc_parts.append(
+                    damage_str(
+                        damage["count"],
+                        damage["dice"],
+                        0,
+                        damage["type"],
+                    )
                 )
                 if i == len(additional_damages) - 1:
-                    description += ", and "
+                    desc_parts.append(", and ")
                 elif i < len(additional_damages):
-                    description += ", "
+                    desc_parts.append(", ")
 
-        description += "."
+        desc_parts.append(".")
         if attack["description"]:
-            description += f" {attack['description']}"
+            desc_parts.append(f" {attack['description']}")
+        description = "".join(desc_parts)
 
         attacks.append(
             {
                 "name": attack["name"],
-                "desc": process_description(description, json_stats),
+                "desc": process_description(description, subs),
             }
         )
 
     return attacks
 
 
-def process_action(action: dict, json_stats: dict) -> dict[str, str]:
+def process_action(action: dict, subs: dict[str, str]) -> dict[str, str]:
     """Processes a single action, bonus action, or reaction"""
     name = action["name"]
     limited_use = action.get("limitedUse")
@@ -200,65 +285,55 @@ def process_action(action: dict, json_stats: dict) -> dict[str, str]:
         name += f" ({limited_use['count']}/day)"
     return {
         "name": name,
-        "desc": process_description(action["description"], json_stats),
+        "desc": process_description(action["description"], subs),
     }
 
 
-def process_description(description: str, json_stats: dict) -> str:
-    """Processes a description, replacing tags in braces with the correct text."""
+def build_substitutions(json_stats: dict) -> dict[str, str]:
+    """Builds the token -> replacement table used by `process_description`."""
+    subs = {}
+
     # Save DCs and attack modifiers
     prof_bonus = json_stats["proficiency"]
-    for ability in ABILITIES:
+    for ability, dc_token, modifier_token in _ABILITY_TOKENS:
         bonus = calc_modifier(json_stats["stats"][ability]) + prof_bonus
-        description = description.replace(
-            f"{{DC:{ability}}}",
-            f"DC {8 + bonus}",
-        ).replace(
-            f"{{A:{ability}}}",
-            f"{bonus:+}",
-        )
+        subs[dc_token] = f"DC {8 + bonus}"
+        subs[modifier_token] = f"{bonus:+}"
 
     # Name
     name_str = json_stats["name"]
     if json_stats["useArticleInToken"]:
         name_str = f"the {name_str}"
-    description = description.replace(
-        "{monster.name}",
-        name_str,
-    ).replace(
-        "{NAME}",
-        name_str,
-    )
+    subs["{monster.name}"] = name_str
+    subs["{NAME}"] = name_str
 
     # Proficiency
-    description = description.replace(
-        "{monster.proficiency}",
-        f"{prof_bonus}",
-    )
+    subs["{monster.proficiency}"] = f"{prof_bonus}"
 
     # Armor class
-    description = description.replace(
-        "{monster.AC}",
-        f"{json_stats['AC']}",
-    )
+    subs["{monster.AC}"] = f"{json_stats['AC']}"
 
     # HP
     dice_count = json_stats["HP"]["HD"]
     hp_bonus = calc_modifier(json_stats["stats"]["CON"]) * dice_count
-    description = description.replace(
-        "{monster.hp}",
-        f"{dice_count}d{json_stats['HP']['type']}{hp_bonus:+}",
-    )
+    subs["{monster.hp}"] = f"{dice_count}d{json_stats['HP']['type']}{hp_bonus:+}"
+
+    return subs
 
-    return description
 
+def process_description(description: str, subs: dict[str, str]) -> str:
+    """Processes a description, replacing tags in braces with the correct text."""
+    return _DESC_TOKEN_RE.sub(lambda match: subs[match.group(0)], description)
 
-def process_legendary_actions(json_stats: dict) -> list[dict[str, str]]:
+
+def process_legendary_actions(
+    json_stats: dict, subs: dict[str, str]
+) -> list[dict[str, str]]:
     actions: list[dict[str, str]] = []
     for action_info in json_stats["legendaryActions"]["actions"]:
         action = get_action(action_info["actionId"], json_stats)
         if action["legendaryOnly"]:
-            action = process_action(action, json_stats)
+            action = process_action(action, subs)
         else:
             action = {
                 "name": action["name"],
@@ -270,6 +345,27 @@ def process_legendary_actions(json_stats: dict) -> list[dict[str, str]]:
     return actions
 
 
+def _build_actions(
+    json_stats: dict, subs: dict[str, str]
+) -> tuple[list[dict[str, str]], list[dict[str, str]]]:
+    """
+    Builds the main actions list (multiattack, attacks, then regular actions),
+    partitioning regular and bonus actions in a single pass.
+    """
+    actions: list[dict[str, str]] = []
+    if multiattack := process_multiattack(json_stats):
+        actions.append({"name": "Multiattack", "desc": multiattack})
+    actions.extend(process_attacks(json_stats, subs))
+
+    bonus_actions = []
+    for action in json_stats["actions"]:
+        if action["bonusAction"]:
+            bonus_actions.append(process_action(action, subs))
+        elif not action["legendaryOnly"]:
+            actions.append(process_action(action, subs))
+    return actions, bonus_actions
+
+
 def process_speed(json_stats: dict) -> str:
     """Returns the string of speeds."""
     speed_strs = []
@@ -296,9 +392,17 @@ def parse_stats(json_stats: dict) -> dict:
 
     stats = {"layout": "Basic 5e Layout", "dice": True}
 
+    # Index attacks and actions by ID so get_action is a single lookup
+    json_stats["_action_index"] = build_action_index(json_stats)
+
+    # Compute the description substitution table once for the whole statblock
+    subs = build_substitutions(json_stats)
+
     # Stats used for calculating other stats
     proficiency_bonus = json_stats["proficiency"]
     abilities = json_stats["stats"]
+    ability_scores = tuple(abilities[abbr] for abbr in ABILITIES)
+    modifiers = dict(zip(ABILITIES, map(calc_modifier, ability_scores)))
 
     # Identically named attributes
     identical_attributes = [
@@ -314,31 +418,30 @@ def parse_stats(json_stats: dict) -> dict:
     # Other one-liner attributes
     stats["ac"] = json_stats["AC"]
     stats["cr"] = json_stats["CR"]
-    stats["damage_vulnerabilities"] = ", ".join(json_stats["vulnerabilities"])
-    stats["damage_resistances"] = ", ".join(json_stats["resistances"])
-    stats["damage_immunities"] = ", ".join(json_stats["immunities"])
-    stats["condition_immunities"] = ", ".join(json_stats["conditions"])
+    # Only emit these when non-empty so the YAML output skips them entirely
+    stats.update(
+        (stats_key, joined)
+        for stats_key, json_key in (
+            ("damage_vulnerabilities", "vulnerabilities"),
+            ("damage_resistances", "resistances"),
+            ("damage_immunities", "immunities"),
+            ("condition_immunities", "conditions"),
+        )
+        if (joined := ", ".join(json_stats[json_key]))
+    )
 
     # Speed
     stats["speed"] = process_speed(json_stats)
 
     # Ability scores
-    stats["abilities"] = [
-        abilities["STR"],
-        abilities["DEX"],
-        abilities["CON"],
-        abilities["INT"],
-        abilities["WIS"],
-        abilities["CHA"],
-    ]
+    stats["abilities"] = list(ability_scores)
 
     # Hit dice and hp
     hp_info = json_stats["HP"]
     num_dice = hp_info["HD"]
     dice_type = hp_info["type"]
-    stats["hp"] = floor(
-        dice_avg(dice_type) * num_dice + calc_modifier(abilities["CON"]) * num_dice
-    )
+    # Integer-only equivalent of floor(dice_avg(dice_type) * num_dice + con * num_dice)
+    stats["hp"] = (num_dice * (dice_type + 1)) // 2 + modifiers["CON"] * num_dice
     stats["hit_dice"] = f"{num_dice}d{dice_type}"
 
     # Saving throws
@@ -348,7 +451,7 @@ def parse_stats(json_stats: dict) -> dict:
         if json_save["override"]:
             saves[stat] = json_save["overrideValue"]
         elif json_save["proficient"]:
-            saves[stat] = calc_modifier(abilities[abbr]) + proficiency_bonus
+            saves[stat] = modifiers[abbr] + proficiency_bonus
 
     # Skills
     skills = {}
@@ -357,10 +460,7 @@ def parse_stats(json_stats: dict) -> dict:
         if json_skill["override"]:
             skills[name] = json_skill["overrideValue"]
         elif json_skill["proficient"]:
-            skills[name] = (
-                calc_modifier(abilities[json_skill["skill"]["stat"]])
-                + proficiency_bonus
-            )
+            skills[name] = modifiers[json_skill["skill"]["stat"]] + proficiency_bonus
             if json_skill["expertise"]:
                 skills[name] += proficiency_bonus
     stats["skillsaves"] = skills
@@ -386,56 +486,40 @@ def parse_stats(json_stats: dict) -> dict:
     for json_trait in json_stats["traits"]:
         name = json_trait["name"]
         if (uses := json_trait["limitedUse"])["count"]:
-            name.append(f" ({uses['count']}/{uses['rate']})")
+            name = f"{name} ({uses['count']}/{uses['rate']})"
 
         traits.append(
             {
                 "name": name,
-                "desc": process_description(json_trait["description"], json_stats),
+                "desc": process_description(json_trait["description"], subs),
             }
         )
     stats["traits"] = traits
 
     # Actions
-    stats["actions"]: list[dict[str, str]] = []
-    multiattack = process_multiattack(json_stats)
-    if multiattack:
-        stats["actions"].append(
-            {"name": "Multiattack", "desc": process_multiattack(json_stats)}
-        )
-    stats["actions"].extend(process_attacks(json_stats))
-    stats["actions"].extend(
-        [
-            process_action(action, json_stats)
-            for action in json_stats["actions"]
-            if not (action["legendaryOnly"] or action["bonusAction"])
-        ]
-    )
+    stats["actions"], bonus_actions = _build_actions(json_stats, subs)
 
     # Reactions
     stats["reactions"] = [
-        process_action(reaction, json_stats) for reaction in json_stats["reactions"]
+        process_action(reaction, subs) for reaction in json_stats["reactions"]
     ]
 
     # Bonus actions
-    stats["bonus_actions"] = [
-        process_action(a, json_stats) for a in json_stats["actions"] if a["bonusAction"]
-    ]
+    stats["bonus_actions"] = bonus_actions
 
-    stats["legendary_actions"] = process_legendary_actions(json_stats)
+    stats["legendary_actions"] = process_legendary_actions(json_stats, subs)
 
     return stats
 
 
 def main(path: Path):
     """Main function"""
-    with open(path, encoding="utf-8", mode="r") as f:
-        json_stats = json.load(f)
+    json_stats = json_loads(path.read_bytes())
     stats = parse_stats(json_stats)
-    output = yaml.safe_dump(stats, sort_keys=False, indent=2)
-    print(
-        f"```statblock\n{output}\n```".strip()
-    )
+    # Stream straight to stdout so the document is never buffered in full
+    sys.stdout.write("```statblock\n")
+    yaml.dump(stats, sys.stdout, Dumper=SafeDumper, sort_keys=False, indent=2)
+    sys.stdout.write("\n```\n")
 
 
 if __name__ == "__main__":